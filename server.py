@@ -5,14 +5,21 @@ A simple, standalone FastMCP server for managing clothing store inventory.
 Uses streamable HTTP transport and Azure Table Storage for persistent data.
 """
 
+import asyncio
 import logging
 import os
 import json
+import sys
+import time
 from typing import Dict, Any, List, Optional
 
+import aiohttp
 from mcp.server.fastmcp import FastMCP
-from azure.data.tables import TableServiceClient, TableClient
-from azure.identity import DefaultAzureCredential
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.data.tables.aio import TableClient
+from azure.identity.aio import ManagedIdentityCredential
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -30,20 +37,75 @@ mcp = FastMCP(
 STORAGE_ACCOUNT_NAME = os.environ.get("STORAGE_ACCOUNT_NAME", "")
 MANAGED_IDENTITY_CLIENT_ID = os.environ.get("AZURE_CLIENT_ID", "")
 TABLE_NAME = "ClothingInventory"
+# Seconds to wait for a connection to Table Storage before failing the request
+TABLE_CONNECTION_TIMEOUT = 5
+# Connection pool shared by all Table Storage requests from this process
+TABLE_CONNECTION_LIMIT = 100
+TABLE_KEEPALIVE_TIMEOUT = 60
+# Python releases before 3.12.8 (and 3.13.0) can leak aborted SSL transports, which
+# aiohttp cleans up when asked; later releases fixed this and aiohttp warns if asked
+TABLE_CLEANUP_CLOSED = (3, 13, 0) <= sys.version_info < (3, 13, 1) or sys.version_info < (3, 12, 8)
+# Maximum number of operations Table Storage accepts in a single transaction
+TABLE_BATCH_SIZE = 100
+# Entity holding the next item ID to hand out, kept outside the INVENTORY partition
+COUNTER_PARTITION_KEY = "META"
+COUNTER_ROW_KEY = "ID_COUNTER"
+# OData filter for the inventory partition, built once instead of on every query
+INVENTORY_FILTER = "PartitionKey eq 'INVENTORY'"
+# Standard sizes are stored as their own integer columns (e.g. SizeM). Any other
+# size keys fall back to the JSON-encoded Sizes column.
+SIZE_KEYS = ["XS", "S", "M", "L", "XL", "XXL", "XXXL"]
+SIZE_COLUMNS = [f"Size{size}" for size in SIZE_KEYS]
+# Columns returned to MCP clients for each item
+ITEM_COLUMNS = ["ItemId", "Name", "Category", "Price", "Description", "Sizes"] + SIZE_COLUMNS
 table_client: Optional[TableClient] = None
+credential: Optional[ManagedIdentityCredential] = None
+http_session: Optional[aiohttp.ClientSession] = None
 
-def get_table_client() -> TableClient:
-    """Get or create the Table Storage client."""
-    global table_client
+# Inventory reads are served from memory while younger than INVENTORY_MAX_AGE seconds,
+# and served stale for INVENTORY_STALE_WHILE_REVALIDATE more seconds while a
+# background refresh runs
+INVENTORY_MAX_AGE = float(os.environ.get("INVENTORY_MAX_AGE", "5"))
+INVENTORY_STALE_WHILE_REVALIDATE = float(os.environ.get("INVENTORY_STALE_WHILE_REVALIDATE", "30"))
+
+# Bumped on every inventory write so in-flight refreshes don't cache stale data
+inventory_version = 0
+# items_by_id is patched by this process's own writes instead of being invalidated,
+# so it keeps its own timestamp
+inventory_cache: Dict[str, Any] = {
+    "value": None,
+    "fetched_at": float("-inf"),
+    "items_by_id": {},
+    "items_fetched_at": float("-inf")
+}
+# The refresh in flight, shared by every reader, and the inventory version it started at
+inventory_refresh_task: Optional[asyncio.Task] = None
+inventory_refresh_version = -1
+# Set once the inventory is known to be seeded, so reads skip the empty-table check
+inventory_initialized = False
+
+# Guard the paths that mutate shared state; reads stay lock-free
+table_client_lock = asyncio.Lock()
+id_counter_lock = asyncio.Lock()
+
+async def get_table_client() -> TableClient:
+    """Get or create the async Table Storage client."""
+    global table_client, credential, http_session
     
-    if table_client is None:
+    if table_client is not None:
+        return table_client
+    
+    # Concurrent first requests would otherwise each build a client and create the table
+    async with table_client_lock:
+        if table_client is not None:
+            return table_client
+        
         if not STORAGE_ACCOUNT_NAME:
             raise ValueError("STORAGE_ACCOUNT_NAME environment variable not set")
         
         account_url = f"https://{STORAGE_ACCOUNT_NAME}.table.core.windows.net"
         
         # Use managed identity with explicit client ID
-        from azure.identity import ManagedIdentityCredential
         if MANAGED_IDENTITY_CLIENT_ID:
             logger.info(f"Using ManagedIdentityCredential with client_id: {MANAGED_IDENTITY_CLIENT_ID[:8]}...")
             credential = ManagedIdentityCredential(client_id=MANAGED_IDENTITY_CLIENT_ID)
@@ -51,41 +113,205 @@ def get_table_client() -> TableClient:
             logger.warning("No client ID found, using default ManagedIdentityCredential")
             credential = ManagedIdentityCredential()
         
-        # Create table client directly
-        table_client = TableClient(
+        # Create table client directly, on one long-lived aiohttp session so that
+        # concurrent tool calls reuse its keep-alive connection pool. Like the session
+        # azure-core would create, it ignores cookies and leaves decompression to azure-core.
+        http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=TABLE_CONNECTION_LIMIT,
+                keepalive_timeout=TABLE_KEEPALIVE_TIMEOUT,
+                enable_cleanup_closed=TABLE_CLEANUP_CLOSED
+            ),
+            cookie_jar=aiohttp.DummyCookieJar(),
+            trust_env=True,
+            auto_decompress=False
+        )
+        transport = AioHttpTransport(
+            session=http_session,
+            session_owner=False,
+            connection_timeout=TABLE_CONNECTION_TIMEOUT
+        )
+        client = TableClient(
             endpoint=account_url,
             table_name=TABLE_NAME,
-            credential=credential
+            credential=credential,
+            transport=transport
         )
         
-        # Create table if it doesn't exist
+        # Create table if it doesn't exist. This only runs when the client is
+        # first created, not on every request.
         try:
-            table_client.create_table()
+            await client.create_table()
             logger.info(f"Created table: {TABLE_NAME}")
         except Exception as e:
             # Table might already exist
             logger.info(f"Table {TABLE_NAME} status: {e}")
+        
+        # Only publish the client once the table is known to exist
+        table_client = client
     
     return table_client
 
-def init_inventory():
+async def close_table_client():
+    """Close the Table Storage client, its HTTP session and its credential."""
+    global table_client, credential, http_session
+    
+    if table_client is not None:
+        await table_client.close()
+        table_client = None
+    if http_session is not None:
+        # The transport doesn't own the session, so closing the client leaves it open
+        await http_session.close()
+        http_session = None
+    if credential is not None:
+        await credential.close()
+        credential = None
+
+def invalidate_inventory_cache():
+    """Force the next inventory read to refresh from Table Storage after a write."""
+    global inventory_version
+    inventory_version += 1
+    inventory_cache["fetched_at"] = float("-inf")
+
+def get_cached_item(item_id: int) -> Optional[Dict[str, Any]]:
+    """Get an item from the cache, if the cache is recent enough to trust."""
+    age = time.monotonic() - inventory_cache["items_fetched_at"]
+    if age < INVENTORY_MAX_AGE + INVENTORY_STALE_WHILE_REVALIDATE:
+        return inventory_cache["items_by_id"].get(item_id)
+    return None
+
+def odata_string(value: str) -> str:
+    """Quote a string literal for use in an OData filter."""
+    return "'" + value.replace("'", "''") + "'"
+
+def sizes_to_columns(sizes: Dict[str, int]) -> Dict[str, Any]:
+    """Map item sizes onto Table Storage entity columns."""
+    columns = {f"Size{size}": quantity for size, quantity in sizes.items() if size in SIZE_KEYS}
+    
+    other_sizes = {size: quantity for size, quantity in sizes.items() if size not in SIZE_KEYS}
+    if other_sizes:
+        columns["Sizes"] = json.dumps(other_sizes)
+    
+    return columns
+
+def entity_sizes(entity: Dict[str, Any]) -> Dict[str, int]:
+    """Read item sizes back from Table Storage entity columns."""
+    sizes = {}
+    for size, column in zip(SIZE_KEYS, SIZE_COLUMNS):
+        # Projected columns the entity doesn't have come back as None
+        if entity.get(column) is not None:
+            sizes[size] = entity[column]
+    
+    # Non-standard sizes, and rows written before sizes had their own columns
+    if entity.get('Sizes'):
+        for size, quantity in json.loads(entity['Sizes']).items():
+            sizes.setdefault(size, quantity)
+    
+    return sizes
+
+def entity_to_item(entity: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a Table Storage entity into an inventory item."""
+    return {
+        'id': entity['ItemId'],
+        'name': entity['Name'],
+        'category': entity['Category'],
+        'price': entity['Price'],
+        'description': entity['Description'],
+        'sizes': entity_sizes(entity)
+    }
+
+async def seed_id_counter(client: TableClient, next_id: Optional[int] = None):
+    """Make sure the item ID counter hands out IDs above every stored item.
+    
+    Creates the counter if it doesn't exist yet, and raises it with an
+    ETag-conditioned update if it has fallen behind. It is never lowered.
+    
+    Args:
+        client: Table Storage client
+        next_id: Lowest ID the counter may hand out; computed from the stored items if omitted
+    """
+    if next_id is None:
+        entities = [e async for e in client.query_entities(INVENTORY_FILTER, select="ItemId")]
+        next_id = max([e['ItemId'] for e in entities], default=0) + 1
+    
+    while True:
+        try:
+            counter = await client.get_entity(partition_key=COUNTER_PARTITION_KEY, row_key=COUNTER_ROW_KEY)
+        except ResourceNotFoundError:
+            try:
+                await client.create_entity({
+                    "PartitionKey": COUNTER_PARTITION_KEY,
+                    "RowKey": COUNTER_ROW_KEY,
+                    "NextId": next_id
+                })
+                logger.info(f"Seeded item ID counter at {next_id}")
+                return
+            except ResourceExistsError:
+                # Another writer seeded it first, check its value instead
+                continue
+        
+        if counter['NextId'] >= next_id:
+            return
+        
+        counter['NextId'] = next_id
+        try:
+            await client.update_entity(
+                counter,
+                mode="replace",
+                etag=counter.metadata['etag'],
+                match_condition=MatchConditions.IfNotModified
+            )
+            logger.info(f"Raised item ID counter to {next_id}")
+            return
+        except ResourceModifiedError:
+            logger.info("Item ID counter changed concurrently, retrying")
+
+async def next_item_id(client: TableClient) -> int:
+    """Reserve the next item ID from the counter entity.
+    
+    The counter is bumped with an ETag-conditioned update, so concurrent
+    writers retry instead of handing out the same ID twice.
+    """
+    # Serialize this instance's increments so they don't all collide on the same
+    # ETag; other instances are still handled by the conditional update
+    async with id_counter_lock:
+        while True:
+            try:
+                counter = await client.get_entity(partition_key=COUNTER_PARTITION_KEY, row_key=COUNTER_ROW_KEY)
+            except ResourceNotFoundError:
+                # Table predates the counter, seed it from the stored items
+                await seed_id_counter(client)
+                continue
+            
+            next_id = counter['NextId']
+            counter['NextId'] = next_id + 1
+            try:
+                await client.update_entity(
+                    counter,
+                    mode="replace",
+                    etag=counter.metadata['etag'],
+                    match_condition=MatchConditions.IfNotModified
+                )
+                return next_id
+            except ResourceModifiedError:
+                logger.info("Item ID counter changed concurrently, retrying")
+
+async def init_inventory():
     """Initialize Table Storage with sample data if empty."""
+    global inventory_initialized
+    
     try:
-        client = get_table_client()
+        client = await get_table_client()
         
-        # Check if table has any data
-        entities = list(client.list_entities(select="PartitionKey"))
+        # Check if table has any inventory data
+        entities = [e async for e in client.query_entities(INVENTORY_FILTER, select="PartitionKey")]
         
         if len(entities) == 0:
-            # Load sample data
-            import importlib
-            import inventory_data
-            importlib.reload(inventory_data)
+            # Load sample data. A plain import is cached after the first load.
             from inventory_data import SAMPLE_INVENTORY
             
-            # Insert sample data into Table Storage
-            for item in SAMPLE_INVENTORY:
-                entity = {
+            sample_entities = [
+                {
                     "PartitionKey": "INVENTORY",
                     "RowKey": str(item['id']),
                     "ItemId": item['id'],
@@ -93,55 +319,121 @@ def init_inventory():
                     "Category": item['category'],
                     "Price": item['price'],
                     "Description": item['description'],
-                    "Sizes": json.dumps(item['sizes'])  # Store sizes as JSON string
+                    **sizes_to_columns(item['sizes'])
                 }
-                client.upsert_entity(entity)
+                for item in SAMPLE_INVENTORY
+            ]
+            
+            # Insert sample data into Table Storage as transactional batches. All rows
+            # share the INVENTORY partition, so each batch is a single round trip.
+            await asyncio.gather(*(
+                client.submit_transaction(
+                    [("upsert", entity) for entity in sample_entities[start:start + TABLE_BATCH_SIZE]]
+                )
+                for start in range(0, len(sample_entities), TABLE_BATCH_SIZE)
+            ))
+            await seed_id_counter(client, max([item['id'] for item in SAMPLE_INVENTORY], default=0) + 1)
+            invalidate_inventory_cache()
             
             logger.info(f"Table Storage initialized with {len(SAMPLE_INVENTORY)} items")
         else:
             logger.info(f"Table Storage already contains {len(entities)} items")
+        
+        inventory_initialized = True
             
     except Exception as e:
         logger.error(f"Error initializing Table Storage: {e}")
         # Don't raise - allow the server to start and initialize on first request
         logger.warning("Table Storage initialization deferred")
 
+async def refresh_inventory() -> Dict[str, Any]:
+    """Load the inventory from Table Storage and cache it."""
+    global inventory_initialized
+    
+    version = inventory_version
+    fetched_at = time.monotonic()
+    client = await get_table_client()
+    entities = [e async for e in client.query_entities(INVENTORY_FILTER, select=ITEM_COLUMNS)]
+    
+    # If empty and startup initialization didn't succeed, try to initialize
+    if not inventory_initialized:
+        if len(entities) == 0:
+            logger.info("No inventory found, initializing...")
+            await init_inventory()
+            # Seeding invalidates the cache, so version the result from after the seed
+            version = inventory_version
+            fetched_at = time.monotonic()
+            entities = [e async for e in client.query_entities(INVENTORY_FILTER, select=ITEM_COLUMNS)]
+        else:
+            inventory_initialized = True
+    
+    # Collect categories in the same pass, in first-seen order
+    items = []
+    categories = {}
+    for entity in entities:
+        items.append(entity_to_item(entity))
+        categories[entity['Category']] = None
+    
+    result = {
+        "items": items,
+        "total_items": len(items),
+        "categories": list(categories)
+    }
+    
+    # Only cache the result if no write happened while it was loading
+    if version == inventory_version:
+        inventory_cache.update(
+            value=result,
+            fetched_at=fetched_at,
+            items_by_id={item['id']: item for item in items},
+            items_fetched_at=fetched_at
+        )
+    
+    return result
+
+def log_refresh_error(task: asyncio.Task):
+    """Log a failed inventory refresh, which background readers never await."""
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Error refreshing inventory: {task.exception()}")
+
+def start_inventory_refresh() -> asyncio.Task:
+    """Start an inventory refresh, or join the one in flight if it started after the last write."""
+    global inventory_refresh_task, inventory_refresh_version
+    
+    if (
+        inventory_refresh_task is None
+        or inventory_refresh_task.done()
+        or inventory_refresh_version != inventory_version
+    ):
+        inventory_refresh_version = inventory_version
+        inventory_refresh_task = asyncio.create_task(refresh_inventory())
+        inventory_refresh_task.add_done_callback(log_refresh_error)
+    
+    return inventory_refresh_task
+
 # FastMCP Tools
 @mcp.tool()
-def get_inventory() -> Dict[str, Any]:
+async def get_inventory() -> Dict[str, Any]:
     """Get all clothing items in inventory with sizes and quantities."""
+    age = time.monotonic() - inventory_cache["fetched_at"]
+    if age < INVENTORY_MAX_AGE:
+        return inventory_cache["value"]
+    
+    if age < INVENTORY_MAX_AGE + INVENTORY_STALE_WHILE_REVALIDATE:
+        # Serve stale data and revalidate without blocking the caller
+        start_inventory_refresh()
+        return inventory_cache["value"]
+    
+    # Readers arriving together, e.g. right after a write, share one refresh. The
+    # shield keeps one caller's cancellation from cancelling it for the others.
     try:
-        client = get_table_client()
-        entities = list(client.query_entities("PartitionKey eq 'INVENTORY'"))
-        
-        # If empty, try to initialize
-        if len(entities) == 0:
-            logger.info("No inventory found, initializing...")
-            init_inventory()
-            entities = list(client.query_entities("PartitionKey eq 'INVENTORY'"))
-        
-        items = []
-        for entity in entities:
-            items.append({
-                'id': entity['ItemId'],
-                'name': entity['Name'],
-                'category': entity['Category'],
-                'price': entity['Price'],
-                'description': entity['Description'],
-                'sizes': json.loads(entity['Sizes'])
-            })
-        
-        return {
-            "items": items,
-            "total_items": len(items),
-            "categories": list(set(item['category'] for item in items))
-        }
+        return await asyncio.shield(start_inventory_refresh())
     except Exception as e:
         logger.error(f"Error getting inventory: {e}")
         return {"error": str(e), "success": False}
 
 @mcp.tool()
-def add_item(
+async def add_item(
     name: str, 
     category: str, 
     price: float, 
@@ -161,24 +453,33 @@ def add_item(
         sizes = {"S": 0, "M": 0, "L": 0}
     
     try:
-        client = get_table_client()
-        
-        # Get the next available ID
-        entities = list(client.query_entities("PartitionKey eq 'INVENTORY'", select="ItemId"))
-        next_id = max([e['ItemId'] for e in entities], default=0) + 1
+        client = await get_table_client()
         
-        entity = {
-            "PartitionKey": "INVENTORY",
-            "RowKey": str(next_id),
-            "ItemId": next_id,
-            "Name": name,
-            "Category": category,
-            "Price": price,
-            "Description": description,
-            "Sizes": json.dumps(sizes)
-        }
+        # Reserve the next available ID. create_entity refuses to overwrite an existing
+        # row, so if the counter has fallen behind the stored items, re-seed it from
+        # the highest stored ID and reserve again.
+        while True:
+            next_id = await next_item_id(client)
+            
+            entity = {
+                "PartitionKey": "INVENTORY",
+                "RowKey": str(next_id),
+                "ItemId": next_id,
+                "Name": name,
+                "Category": category,
+                "Price": price,
+                "Description": description,
+                **sizes_to_columns(sizes)
+            }
+            
+            try:
+                await client.create_entity(entity)
+                break
+            except ResourceExistsError:
+                logger.warning(f"Item ID {next_id} is already taken, re-seeding the item ID counter")
+                await seed_id_counter(client)
         
-        client.upsert_entity(entity)
+        invalidate_inventory_cache()
         
         new_item = {
             'id': next_id,
@@ -195,34 +496,25 @@ def add_item(
         return {"error": str(e), "success": False}
 
 @mcp.tool()
-def get_item_by_id(item_id: int) -> Dict[str, Any]:
+async def get_item_by_id(item_id: int) -> Dict[str, Any]:
     """Get details of a specific item by ID.
     
     Args:
         item_id: ID of the item to retrieve
     """
     try:
-        client = get_table_client()
-        entity = client.get_entity(partition_key="INVENTORY", row_key=str(item_id))
-        
-        item = {
-            'id': entity['ItemId'],
-            'name': entity['Name'],
-            'category': entity['Category'],
-            'price': entity['Price'],
-            'description': entity['Description'],
-            'sizes': json.loads(entity['Sizes'])
-        }
+        client = await get_table_client()
+        entity = await client.get_entity(partition_key="INVENTORY", row_key=str(item_id), select=ITEM_COLUMNS)
         
-        return {"success": True, "item": item}
+        return {"success": True, "item": entity_to_item(entity)}
+    except ResourceNotFoundError:
+        return {"success": False, "error": "Item not found"}
     except Exception as e:
-        if "ResourceNotFound" in str(type(e).__name__):
-            return {"success": False, "error": "Item not found"}
         logger.error(f"Error getting item {item_id}: {e}")
         return {"error": str(e), "success": False}
 
 @mcp.tool()
-def update_item_quantity(item_id: int, size: str, quantity: int) -> Dict[str, Any]:
+async def update_item_quantity(item_id: int, size: str, quantity: int) -> Dict[str, Any]:
     """Update stock quantity for a specific item and size.
     
     Args:
@@ -231,62 +523,74 @@ def update_item_quantity(item_id: int, size: str, quantity: int) -> Dict[str, An
         quantity: New quantity
     """
     try:
-        client = get_table_client()
-        entity = client.get_entity(partition_key="INVENTORY", row_key=str(item_id))
+        client = await get_table_client()
         
-        # Parse sizes, update the specific size, and save back
-        sizes = json.loads(entity['Sizes'])
+        # An item's set of sizes never changes once it is added, so a recently cached
+        # item is enough to validate the size and build the response without reading
+        # the row. Non-standard sizes share the JSON column and need the current row.
+        item = get_cached_item(item_id)
+        if item is None or size not in SIZE_KEYS:
+            entity = await client.get_entity(partition_key="INVENTORY", row_key=str(item_id), select=ITEM_COLUMNS)
+            item = entity_to_item(entity)
         
-        if size not in sizes:
+        if size not in item['sizes']:
             return {"success": False, "error": f"Size '{size}' not found for this item"}
         
-        sizes[size] = quantity
-        entity['Sizes'] = json.dumps(sizes)
+        sizes = {**item['sizes'], size: quantity}
+        if size in SIZE_KEYS:
+            changes = {f"Size{size}": quantity}
+        else:
+            # Rewriting every size column also migrates rows that stored all sizes as JSON
+            changes = sizes_to_columns(sizes)
         
-        # Update the entity
-        client.update_entity(entity, mode="replace")
+        # Merge only the changed columns; this raises ResourceNotFoundError if the item is gone
+        await client.update_entity(
+            {"PartitionKey": "INVENTORY", "RowKey": str(item_id), **changes},
+            mode="merge"
+        )
+        invalidate_inventory_cache()
         
-        # Return the updated item
-        item = {
-            'id': entity['ItemId'],
-            'name': entity['Name'],
-            'category': entity['Category'],
-            'price': entity['Price'],
-            'description': entity['Description'],
-            'sizes': sizes
-        }
+        # Patch only the changed size into the cached item, so it stays accurate for
+        # the next update even if other sizes were updated concurrently
+        cached_item = get_cached_item(item_id)
+        if cached_item is not None:
+            item = {**cached_item, 'sizes': {**cached_item['sizes'], size: quantity}}
+            inventory_cache["items_by_id"][item_id] = item
+        else:
+            item = {**item, 'sizes': sizes}
         
+        # Return the updated item
         return {"success": True, "item": item}
+    except ResourceNotFoundError:
+        return {"success": False, "error": "Item not found"}
     except Exception as e:
-        if "ResourceNotFound" in str(type(e).__name__):
-            return {"success": False, "error": "Item not found"}
         logger.error(f"Error updating quantity: {e}")
         return {"error": str(e), "success": False}
 
 @mcp.tool()
-def search_items(query: str) -> Dict[str, Any]:
+async def search_items(query: str, category: Optional[str] = None) -> Dict[str, Any]:
     """Search items by name or category.
     
     Args:
         query: Search query to match against item names or categories
+        category: Only return items in this exact category (optional)
     """
     try:
-        client = get_table_client()
-        entities = client.query_entities("PartitionKey eq 'INVENTORY'")
+        client = await get_table_client()
+        
+        # Exact category matches are filtered by Table Storage; substring matching
+        # has no OData equivalent, so the query is matched here
+        query_filter = INVENTORY_FILTER
+        if category:
+            query_filter += f" and Category eq {odata_string(category)}"
+        entities = client.query_entities(query_filter, select=ITEM_COLUMNS)
         
         query_lower = query.lower()
         results = []
         
-        for entity in entities:
+        async for entity in entities:
             if query_lower in entity['Name'].lower() or query_lower in entity['Category'].lower():
-                results.append({
-                    'id': entity['ItemId'],
-                    'name': entity['Name'],
-                    'category': entity['Category'],
-                    'price': entity['Price'],
-                    'description': entity['Description'],
-                    'sizes': json.loads(entity['Sizes'])
-                })
+                results.append(entity_to_item(entity))
         
         return {
             "items": results,
@@ -297,6 +601,22 @@ def search_items(query: str) -> Dict[str, Any]:
         logger.error(f"Error searching items: {e}")
         return {"error": str(e), "success": False}
     
+async def serve():
+    """Initialize Table Storage and run the MCP server on the same event loop."""
+    
+    # Initialize Table Storage (non-blocking - errors are logged but don't stop startup)
+    try:
+        await init_inventory()
+    except Exception as e:
+        logger.error(f"Table Storage initialization failed, will retry on first request: {e}")
+    
+    # Run the server
+    logger.info("Starting MCP server with streamable-http transport")
+    try:
+        await mcp.run_streamable_http_async()
+    finally:
+        await close_table_client()
+
 def main():
     """Run the Clothing Inventory MCP Server."""
     
@@ -305,15 +625,9 @@ def main():
         logger.info("Starting Clothing Inventory MCP Server")
         logger.info(f"MCP Server will start on default port 8000")
         
-        # Initialize Table Storage (non-blocking - errors are logged but don't stop startup)
-        try:
-            init_inventory()
-        except Exception as e:
-            logger.error(f"Table Storage initialization failed, will retry on first request: {e}")
-        
-        # Run the server
-        logger.info("Starting MCP server with streamable-http transport")
-        mcp.run(transport="streamable-http")
+        # The async Table client is bound to the loop that created it, so
+        # initialization and request handling share a single event loop
+        asyncio.run(serve())
         
     except Exception as e:
         logger.error(f"Server crashed with error: {e}")